@@ -0,0 +1,62 @@
+"""
+Measures the cold-start import time of the ``template_utils`` modules.
+
+Each module is imported in a fresh interpreter, several times over,
+and the median import time is reported along with which of the heavy
+optional dependencies were loaded as a side effect. Run it from the
+root of a checkout::
+
+    python benchmarks/import_time.py [repetitions]
+
+Django must be importable; the optional dependencies (feedparser,
+markdown, docutils, smartypants) need not be.
+
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+
+MODULES = [
+    'template_utils.markup',
+    'template_utils.nodes',
+    'template_utils.templatetags.feeds',
+    'template_utils.templatetags.generic_content',
+    'template_utils.templatetags.generic_markup',
+    ]
+
+HEAVY_DEPENDENCIES = ['feedparser', 'markdown', 'docutils', 'smartypants', 'django.db.models']
+
+CHILD_SCRIPT = """
+import json, sys, time
+from django.conf import settings
+settings.configure()
+start = time.perf_counter()
+__import__(%r)
+elapsed = time.perf_counter() - start
+print(json.dumps({ 'elapsed': elapsed,
+                   'loaded': [name for name in %r if name in sys.modules] }))
+"""
+
+
+def time_import(module_name):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+    output = subprocess.check_output([sys.executable, '-c', CHILD_SCRIPT % (module_name, HEAVY_DEPENDENCIES)],
+                                     env=env)
+    return json.loads(output)
+
+
+def main(repetitions=10):
+    print('%-48s %12s  %s' % ('module', 'median (ms)', 'heavy dependencies loaded'))
+    for module_name in MODULES:
+        results = [time_import(module_name) for i in range(repetitions)]
+        timings = sorted(result['elapsed'] for result in results)
+        median = timings[len(timings) // 2] * 1000
+        print('%-48s %12.2f  %s' % (module_name, median, ', '.join(results[0]['loaded']) or '-'))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -6,7 +6,8 @@ setup(name='template_utils',
       author='James Bennett',
       author_email='james@b-list.org',
       url='http://code.google.com/p/django-template-utils/',
-      packages=['template_utils', 'template_utils.templatetags'],
+      packages=['template_utils', 'template_utils.templatetags',
+                'template_utils.management', 'template_utils.management.commands'],
       classifiers=['Development Status :: 4 - Beta',
                    'Environment :: Web Environment',
                    'Intended Audience :: Developers',
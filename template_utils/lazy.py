@@ -0,0 +1,42 @@
+"""
+Deferred importing of heavy or optional dependencies.
+
+"""
+
+import importlib
+
+
+def lazy_module(module_name):
+    """
+    Returns an accessor function which imports ``module_name`` the
+    first time it is called, and returns the cached module on every
+    call after that.
+    
+    This keeps the cost of importing heavy dependencies out of module
+    load -- so loading a tag library doesn't pay for a dependency it
+    may never use -- and out of each individual call.
+    
+    If the import fails, the failure is cached too, and an
+    ``ImportError`` is raised on every later call without searching
+    for the module again.
+    
+    Example::
+    
+        _get_feedparser = lazy_module('feedparser')
+        
+        def parse(feed_url):
+            return _get_feedparser().parse(feed_url)
+    
+    """
+    cached = {}
+    def accessor():
+        if 'module' not in cached:
+            if 'error' in cached:
+                raise ImportError(cached['error'], name=module_name)
+            try:
+                cached['module'] = importlib.import_module(module_name)
+            except ImportError as e:
+                cached['error'] = str(e)
+                raise
+        return cached['module']
+    return accessor
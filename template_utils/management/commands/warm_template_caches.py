@@ -0,0 +1,128 @@
+"""
+Management command which fills the feed and generic content caches
+ahead of traffic, e.g. just after a deploy.
+
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django import template
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.template import engines
+from django.template.backends.django import DjangoTemplates
+
+from template_utils.nodes import GenericContentNode
+from template_utils.templatetags.feeds import FeedNodeMixin, get_feed_error, parse
+
+
+def find_templates():
+    """
+    Yields every template which can be loaded from the template
+    directories (including application template directories) of the
+    configured Django template engines.
+
+    Files which aren't valid templates are skipped.
+
+    """
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for template_dir in backend.template_dirs:
+            for dirpath, dirnames, filenames in os.walk(template_dir):
+                for filename in filenames:
+                    name = os.path.relpath(os.path.join(dirpath, filename), template_dir)
+                    try:
+                        yield backend.engine.get_template(name)
+                    except (template.TemplateSyntaxError, template.TemplateDoesNotExist, UnicodeDecodeError):
+                        continue
+
+
+def find_work(templates):
+    """
+    Returns a dictionary mapping a description of each feed and
+    generic content lookup used, with literal arguments, in the given
+    templates to a function which performs it and refreshes its cache,
+    and a set of descriptions of the lookups skipped because their
+    results are never cached.
+
+    Tags whose arguments are context variables are skipped, since
+    their values can't be known ahead of time.
+
+    """
+    work = {}
+    uncached = set()
+    empty_context = template.Context()
+    for tmpl in templates:
+        for node in tmpl.nodelist.get_nodes_by_type(template.Node):
+            if isinstance(node, FeedNodeMixin):
+                try:
+                    feed_url = node.feed_url.resolve(empty_context)
+                except template.VariableDoesNotExist:
+                    continue
+                work.setdefault('feed %s' % feed_url,
+                                lambda feed_url=feed_url: _warm_feed(feed_url))
+            elif isinstance(node, GenericContentNode):
+                description = '%s %s.%s (%s)' % (node.__class__.__name__,
+                                                 node.model._meta.app_label,
+                                                 node.model._meta.object_name,
+                                                 node.num)
+                if not node.cache_results:
+                    uncached.add(description)
+                    continue
+                work.setdefault(description, lambda node=node: node.get_result(refresh=True))
+    return work, uncached
+
+
+def _warm_feed(feed_url):
+    # feedparser reports failed fetches in its result rather than
+    # raising, and parse() doesn't cache them; report them here.
+    error = get_feed_error(parse(feed_url, refresh=True))
+    if error is not None:
+        raise CommandError(error)
+
+
+def _timed(func):
+    start = time.perf_counter()
+    try:
+        func()
+        error = None
+    except Exception as e:
+        error = e
+    finally:
+        connections.close_all()
+    return time.perf_counter() - start, error
+
+
+class Command(BaseCommand):
+    help = ("Scans template directories for feed and generic content tags with literal "
+            "arguments, and fetches their results in parallel to fill the caches.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Number of lookups to run in parallel (default: 8).')
+
+    def handle(self, **options):
+        if not getattr(settings, 'FEED_CACHE_TIMEOUT', None):
+            self.stderr.write("FEED_CACHE_TIMEOUT is not set; feeds will be fetched but not cached.")
+        if not getattr(settings, 'GENERIC_CONTENT_CACHE_TIMEOUT', None):
+            self.stderr.write("GENERIC_CONTENT_CACHE_TIMEOUT is not set; queries will be run but not cached.")
+        work, uncached = find_work(find_templates())
+        for description in sorted(uncached):
+            self.stdout.write("  skipped  %s (results are never cached)" % description)
+        failures = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            results = executor.map(_timed, work.values())
+            for description, (elapsed, error) in zip(work.keys(), results):
+                if error is None:
+                    self.stdout.write("%9.1f ms  %s" % (elapsed * 1000, description))
+                else:
+                    failures += 1
+                    self.stderr.write("%9.1f ms  %s failed: %s" % (elapsed * 1000, description, error))
+        self.stdout.write("Warmed %d of %d item(s) in %.1f ms." % (len(work) - failures,
+                                                                 len(work),
+                                                                 (time.perf_counter() - start) * 1000))
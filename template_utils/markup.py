@@ -3,6 +3,20 @@ Utilities for text-to-HTML conversion.
 
 """
 
+import pickle
+import queue
+import threading
+import time
+from html import escape
+
+from template_utils.lazy import lazy_module
+
+
+_get_django_markup = lazy_module('django.contrib.markup.templatetags.markup')
+_get_markdown = lazy_module('markdown')
+_get_docutils_core = lazy_module('docutils.core')
+_get_multiprocessing = lazy_module('multiprocessing')
+
 
 def textile(text, **kwargs):
     """
@@ -15,16 +29,14 @@ def textile(text, **kwargs):
     supply your own Textile filter.
     
     """
-    from django.contrib.markup.templatetags.markup import textile
-    return textile(text)
+    return _get_django_markup().textile(text)
 
 def markdown(text, **kwargs):
     """
     Applies Markdown conversion to a string, and returns the HTML.
     
     """
-    import markdown
-    return markdown.markdown(text, **kwargs)
+    return _get_markdown().markdown(text, **kwargs)
 
 def restructuredtext(text, **kwargs):
     """
@@ -32,12 +44,22 @@ def restructuredtext(text, **kwargs):
     HTML.
     
     """
-    from docutils import core
-    parts = core.publish_parts(source=text,
-                               writer_name='html4css1',
-                               **kwargs)
+    parts = _get_docutils_core().publish_parts(source=text,
+                                               writer_name='html4css1',
+                                               **kwargs)
     return parts['fragment']
 
+def escape_fallback(text, **kwargs):
+    """
+    Returns the text with HTML special characters escaped, and no
+    other conversion applied.
+    
+    This is the default fallback used by ``MarkupFormatter`` when a
+    filter's input is too large or its conversion takes too long.
+    
+    """
+    return escape(text)
+
 DEFAULT_MARKUP_FILTERS = {
     'textile': textile,
     'markdown': markdown,
@@ -45,6 +67,175 @@ DEFAULT_MARKUP_FILTERS = {
     }
 
 
+class FilterAborted(Exception):
+    """
+    Raised by ``WorkerPool`` when a filter doesn't finish within its
+    time limit, or its worker process dies.
+    
+    """
+    pass
+
+
+def _portable_exception(e):
+    # Some exceptions pickle but can't be rebuilt from the pickle
+    # (docutils' SystemMessage, for one), which would make the
+    # caller's recv() fail instead of reporting the real error.
+    try:
+        pickle.loads(pickle.dumps(e))
+    except Exception:
+        return RuntimeError(repr(e))
+    return e
+
+
+def _worker_main(conn):
+    while True:
+        try:
+            filter_func, text, kwargs = conn.recv()
+        except EOFError:
+            return
+        try:
+            result = ('ok', filter_func(text, **kwargs))
+        except Exception as e:
+            result = ('error', _portable_exception(e))
+        try:
+            conn.send(result)
+        except Exception as e:
+            # The result or exception couldn't be pickled.
+            conn.send(('error', RuntimeError(repr(e))))
+
+
+def _get_context():
+    # Forking a threaded server process is unsafe, so workers are
+    # started from a fork server where one is available.
+    multiprocessing = _get_multiprocessing()
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+class _Worker(object):
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+    
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+class WorkerPool(object):
+    """
+    A pool of reusable worker processes which run filter functions
+    under a wall-clock time limit.
+    
+    A caller gets its answer (or ``FilterAborted``) within its time
+    limit, whether the limit was spent waiting for a free worker or
+    running the filter. A worker still busy when its caller gives up
+    is left to finish in the background and returned to the pool, and
+    is only killed -- and replaced with a fresh one, also in the
+    background -- if the filter itself runs past the limit. So a
+    pathological input can't tie up CPU beyond its budget, and a busy
+    pool doesn't kill healthy workers. Workers are only started the
+    first time the pool is used.
+    
+    Filter functions, their arguments and their results must be
+    picklable, and filter functions must be importable by name.
+    
+    """
+    def __init__(self, processes=2):
+        self.processes = processes
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._context = None
+    
+    def _start(self):
+        with self._lock:
+            if self._context is None:
+                self._context = _get_context()
+                for i in range(self.processes):
+                    self._idle.put(_Worker(self._context))
+    
+    def _recycle(self, worker, job_deadline=None):
+        """
+        In a background thread, waits until ``job_deadline`` for the
+        worker's current job to finish, then returns the worker to
+        the pool; if it doesn't finish (or there's no deadline, for a
+        worker already known to be broken), kills it and puts a fresh
+        worker in its place.
+        
+        """
+        def recycle():
+            healthy = False
+            try:
+                if job_deadline is not None and worker.conn.poll(max(job_deadline - time.monotonic(), 0)):
+                    healthy = True
+                    worker.conn.recv()
+            except (EOFError, OSError):
+                healthy = False
+            except Exception:
+                # The result couldn't be unpickled, but it was read in
+                # full, so the worker itself is fine.
+                pass
+            finally:
+                if healthy:
+                    self._idle.put(worker)
+                else:
+                    worker.kill()
+                    self._idle.put(_Worker(self._context))
+        thread = threading.Thread(target=recycle)
+        thread.daemon = True
+        thread.start()
+    
+    def run(self, timeout, filter_func, text, kwargs):
+        """
+        Runs ``filter_func(text, **kwargs)`` in a worker process and
+        returns the result, raising ``FilterAborted`` if that takes
+        longer than ``timeout`` seconds (including any time spent
+        waiting for a free worker). Exceptions raised by the filter
+        are re-raised here.
+        
+        """
+        deadline = time.monotonic() + timeout
+        self._start()
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise FilterAborted("no worker became free within %s seconds" % timeout)
+        started = time.monotonic()
+        if started >= deadline:
+            self._idle.put(worker)
+            raise FilterAborted("no worker became free within %s seconds" % timeout)
+        # Unless the worker has to be recycled, it goes back to the pool
+        # whatever happens -- including a job which can't be pickled,
+        # or a result which can't be unpickled, neither of which
+        # affects the worker.
+        release = True
+        try:
+            try:
+                worker.conn.send((filter_func, text, kwargs))
+                finished = worker.conn.poll(deadline - started)
+                if finished:
+                    status, value = worker.conn.recv()
+            except (EOFError, OSError):
+                release = False
+                self._recycle(worker)
+                raise FilterAborted("worker process died")
+            if not finished:
+                release = False
+                self._recycle(worker, job_deadline=started + timeout)
+                raise FilterAborted("filter did not finish within %s seconds" % timeout)
+        finally:
+            if release:
+                self._idle.put(worker)
+        if status == 'error':
+            raise value
+        return value
+
+
 class MarkupFormatter(object):
     """
     Generic markup formatter which can handle multiple text-to-HTML
@@ -129,6 +320,34 @@ class MarkupFormatter(object):
     installing Django.
 
 
+    Limiting input size and running time
+    ====================================
+    
+    Some inputs can make a filter run for a very long time. To guard
+    against this, ``register`` accepts two optional keyword
+    arguments:
+    
+    ``max_length``
+        The longest input, in characters, the filter will be applied
+        to.
+    
+    ``timeout``
+        A wall-clock time limit, in seconds. When this is given, the
+        filter runs in a pool of worker processes (``self.pool``, by
+        default two processes), and a worker whose filter exceeds the
+        limit is killed and replaced; see ``WorkerPool``.
+    
+    Input which is too long, or which can't be converted in time, is
+    passed to the instance's fallback function instead -- by default
+    ``escape_fallback``, which returns the text HTML-escaped. A
+    different fallback, and a different number of worker processes,
+    can be passed to the constructor::
+    
+        formatter = MarkupFormatter(fallback=my_fallback, processes=4)
+        formatter.register('restructuredtext', restructuredtext,
+                           max_length=50000, timeout=2)
+    
+    
     Django and template autoescaping
     ================================
 
@@ -173,17 +392,22 @@ class MarkupFormatter(object):
         my_html = formatter(my_string, filter_name=None)
     
     """
-    def __init__(self):
+    def __init__(self, fallback=escape_fallback, processes=2):
         self._filters = {}
+        self._limits = {}
+        self.fallback = fallback
+        self.pool = WorkerPool(processes)
         for filter_name, filter_func in DEFAULT_MARKUP_FILTERS.items():
             self.register(filter_name, filter_func)
     
-    def register(self, filter_name, filter_func):
+    def register(self, filter_name, filter_func, max_length=None, timeout=None):
         """
-        Registers a new filter for use.
+        Registers a new filter for use, optionally limiting the size
+        of its input and its running time.
         
         """
         self._filters[filter_name] = filter_func
+        self._limits[filter_name] = (max_length, timeout)
     
     def __call__(self, text, **kwargs):
         """
@@ -202,10 +426,18 @@ class MarkupFormatter(object):
             return text
         if filter_name not in self._filters:
             raise ValueError("'%s' is not a registered markup filter. Registered filters are: %s." % (filter_name,
-                                                                                                       ', '.join(self._filters.iterkeys())))
+                                                                                                       ', '.join(self._filters.keys())))
         filter_func = self._filters[filter_name]
         filter_kwargs.update(**kwargs)
-        return filter_func(text, **filter_kwargs)
+        max_length, timeout = self._limits[filter_name]
+        if max_length is not None and len(text) > max_length:
+            return self.fallback(text)
+        if timeout is None:
+            return filter_func(text, **filter_kwargs)
+        try:
+            return self.pool.run(timeout, filter_func, text, filter_kwargs)
+        except FilterAborted:
+            return self.fallback(text)
 
 
 # Unless you need to have multiple instances of MarkupFormatter lying
@@ -3,9 +3,40 @@ Subclass of ``template.Node`` for easy context updating.
 
 """
 
-from django.db.models import get_model
+from django.apps import apps
 from django.conf import settings
 from django import template
+from django.core.cache import cache
+
+
+def get_model(model):
+    """
+    Returns the model class named by an "app_name.model_name" string,
+    or ``None`` if there is no such installed model.
+    
+    """
+    try:
+        return apps.get_model(model)
+    except (LookupError, ValueError):
+        return None
+
+
+# Name of the context variable in which ``template_utils.preload``
+# stores the results it has already loaded; see ``get_preloaded``.
+PRELOADED_CONTEXT_KEY = 'template_utils_preloaded'
+
+
+def get_preloaded(context, key, func, *args, **kwargs):
+    """
+    Returns the result stored for ``key`` by
+    ``template_utils.preload.apreload``, if there is one, and
+    otherwise falls back to calling ``func(*args, **kwargs)``.
+    
+    """
+    preloaded = context.get(PRELOADED_CONTEXT_KEY) or {}
+    if key in preloaded:
+        return preloaded[key]
+    return func(*args, **kwargs)
 
 
 class ContextUpdatingNode(template.Node):
@@ -15,6 +46,11 @@ class ContextUpdatingNode(template.Node):
     Subclasses should define ``get_content()``, which should return a
     dictionary to be added to the context.
     
+    Subclasses which perform I/O may also define
+    ``get_preload_key()`` and ``aload()``, so that
+    ``template_utils.preload.apreload`` can fetch their data
+    asynchronously before the template is rendered.
+    
     """
     def render(self, context):
         context.update(self.get_content(context))
@@ -50,12 +86,19 @@ class GenericContentNode(ContextUpdatingNode):
        specified model (filtered as described above) will be available
        as ``self.query_set`` if you want to work with it.
     
+    If the setting ``GENERIC_CONTENT_CACHE_TIMEOUT`` is set to a
+    number of seconds, results are stored in Django's cache for that
+    long; subclasses whose results must not be reused (such as
+    ``RandomObjectsNode``) set ``cache_results`` to ``False``.
+    
     """
+    cache_results = True
+    
     def __init__(self, model, num, varname):
         self.num = num
         self.varname = varname
         lookup_dict = getattr(settings, 'GENERIC_CONTENT_LOOKUP_KWARGS', {})
-        self.model = get_model(*model.split('.'))
+        self.model = get_model(model)
         if self.model is None:
             raise template.TemplateSyntaxError("Generic content tag got invalid model: %s" % model)
         self.query_set = self.model._default_manager.filter(**lookup_dict.get(model, {}))
@@ -63,10 +106,70 @@ class GenericContentNode(ContextUpdatingNode):
     def _get_query_set(self):
         return self.query_set
     
-    def get_content(self, context):
+    def _get_cache_timeout(self):
+        if not self.cache_results:
+            return None
+        return getattr(settings, 'GENERIC_CONTENT_CACHE_TIMEOUT', None)
+    
+    def get_cache_key(self):
+        return 'template_utils.generic_content.%s.%s.%s.%s.%s' % (self.__class__.__module__,
+                                                                  self.__class__.__name__,
+                                                                  self.model._meta.app_label,
+                                                                  self.model._meta.object_name,
+                                                                  self.num)
+    
+    def _query(self):
         query_set = self._get_query_set()
         if self.num == 1:
-            result = query_set[0]
-        else:
-            result = list(query_set[:self.num])
-        return { self.varname: result }
+            return query_set[0]
+        return list(query_set[:self.num])
+    
+    async def _aquery(self):
+        query_set = self._get_query_set()
+        if self.num == 1:
+            return [obj async for obj in query_set[:1]][0]
+        return [obj async for obj in query_set[:self.num]]
+    
+    def get_result(self, refresh=False):
+        """
+        Returns the object(s) retrieved by this node, from the cache
+        if caching is enabled. Passing ``refresh=True`` bypasses the
+        cached value and stores a freshly-retrieved one.
+        
+        """
+        timeout = self._get_cache_timeout()
+        if not timeout:
+            return self._query()
+        result = None
+        if not refresh:
+            result = cache.get(self.get_cache_key())
+        if result is None:
+            result = self._query()
+            cache.set(self.get_cache_key(), result, timeout)
+        return result
+    
+    async def aget_result(self, refresh=False):
+        """
+        Asynchronous counterpart to ``get_result``, using Django's
+        async ORM and cache APIs.
+        
+        """
+        timeout = self._get_cache_timeout()
+        if not timeout:
+            return await self._aquery()
+        result = None
+        if not refresh:
+            result = await cache.aget(self.get_cache_key())
+        if result is None:
+            result = await self._aquery()
+            await cache.aset(self.get_cache_key(), result, timeout)
+        return result
+    
+    def get_preload_key(self, context):
+        return self
+    
+    async def aload(self, context):
+        return await self.aget_result()
+    
+    def get_content(self, context):
+        return { self.varname: get_preloaded(context, self, self.get_result) }
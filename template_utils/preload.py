@@ -0,0 +1,73 @@
+"""
+Asynchronous loading of the data needed by a template's feed and
+generic-content tags, for use under ASGI.
+
+"""
+
+import asyncio
+
+from django import template
+
+from template_utils.nodes import PRELOADED_CONTEXT_KEY
+
+
+def get_preloadable_nodes(tmpl):
+    """
+    Returns a list of all the nodes in a template which know how to
+    load their data asynchronously (that is, which define both
+    ``get_preload_key()`` and ``aload()``).
+
+    Accepts either a ``django.template.Template`` or the wrapper
+    returned by ``django.template.loader.get_template()``.
+
+    """
+    nodelist = getattr(tmpl, 'template', tmpl).nodelist
+    return [node for node in nodelist.get_nodes_by_type(template.Node)
+            if hasattr(node, 'get_preload_key') and hasattr(node, 'aload')]
+
+
+async def apreload(tmpl, context):
+    """
+    Concurrently loads the data needed by every preloadable node in a
+    template, and stores the results in ``context`` so that the nodes
+    use them instead of doing blocking I/O during the (synchronous)
+    render.
+
+    Nodes whose arguments can't be resolved in ``context`` -- for
+    example, because they depend on a loop variable -- are skipped,
+    and will load their data synchronously when rendered, as will
+    nodes whose load failed; so the render should happen in
+    ``sync_to_async`` rather than directly in async code. Nodes which
+    share a key (e.g., two tags parsing the same feed URL) are only
+    loaded once.
+
+    Returns the dictionary of loaded results.
+
+    Example::
+
+        async def my_view(request):
+            tmpl = get_template('index.html')
+            context = Context({ 'user': request.user })
+            await apreload(tmpl, context)
+            html = await sync_to_async(tmpl.template.render)(context)
+            return HttpResponse(html)
+
+    """
+    pending = {}
+    for node in get_preloadable_nodes(tmpl):
+        try:
+            key = node.get_preload_key(context)
+        except template.VariableDoesNotExist:
+            continue
+        if key not in pending:
+            pending[key] = node.aload(context)
+    keys = list(pending.keys())
+    results = await asyncio.gather(*pending.values(), return_exceptions=True)
+    preloaded = {}
+    for key, result in zip(keys, results):
+        # Failures are left for the synchronous render to raise, so
+        # that error behavior is the same with or without preloading.
+        if not isinstance(result, Exception):
+            preloaded[key] = result
+    context.update({ PRELOADED_CONTEXT_KEY: preloaded })
+    return preloaded
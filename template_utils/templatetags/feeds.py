@@ -7,23 +7,142 @@ djangosnippets at http://www.djangosnippets.org/snippets/311/
 
 """
 
+import asyncio
 import datetime
-import feedparser
+import hashlib
 from django import template
+from django.conf import settings
+from django.core.cache import cache
 from django.template.loader import render_to_string
 
-from template_utils.nodes import ContextUpdatingNode
+from template_utils.lazy import lazy_module
+from template_utils.nodes import ContextUpdatingNode, get_preloaded
 
 
-class FeedIncludeNode(template.Node):
+_get_feedparser = lazy_module('feedparser')
+_get_aiohttp = lazy_module('aiohttp')
+
+
+def get_feed_cache_key(feed_url):
+    return 'template_utils.feed.%s' % hashlib.md5(feed_url.encode('utf-8')).hexdigest()
+
+
+def get_feed_error(feed):
+    """
+    Returns a description of the error if ``feed`` is the result of a
+    failed fetch -- an HTTP error status, or a malformed or
+    unreachable feed with no entries -- and ``None`` otherwise.
+    
+    feedparser doesn't raise for these; it returns an empty result.
+    
+    """
+    status = feed.get('status')
+    if status is not None and status >= 400:
+        return "HTTP status %s" % status
+    if feed.get('bozo') and not feed.get('entries'):
+        return str(feed.get('bozo_exception', 'no entries'))
+    return None
+
+
+def parse(feed_url, refresh=False):
+    """
+    Parses a feed with ``feedparser.parse``.
+    
+    If the setting ``FEED_CACHE_TIMEOUT`` is set to a number of
+    seconds, the parsed feed is stored in Django's cache for that
+    long, and reused. Passing ``refresh=True`` bypasses the cached
+    value and stores a freshly-parsed one. Failed fetches (see
+    ``get_feed_error``) are never cached, so a brief outage doesn't
+    blank the feed for the whole timeout.
+    
+    """
+    timeout = getattr(settings, 'FEED_CACHE_TIMEOUT', None)
+    if not timeout:
+        return _get_feedparser().parse(feed_url)
+    feed = None
+    if not refresh:
+        feed = cache.get(get_feed_cache_key(feed_url))
+    if feed is None:
+        feed = _get_feedparser().parse(feed_url)
+        if get_feed_error(feed) is None:
+            cache.set(get_feed_cache_key(feed_url), feed, timeout)
+    return feed
+
+
+async def aparse(feed_url, refresh=False):
+    """
+    Asynchronous counterpart to ``parse``.
+    
+    If ``aiohttp`` is installed it is used to fetch the feed;
+    otherwise ``feedparser`` fetches it in a worker thread. Parsing
+    itself always happens in a worker thread, so the event loop is
+    never blocked.
+    
+    """
+    timeout = getattr(settings, 'FEED_CACHE_TIMEOUT', None)
+    if not timeout:
+        return await _afetch(feed_url)
+    feed = None
+    if not refresh:
+        feed = await cache.aget(get_feed_cache_key(feed_url))
+    if feed is None:
+        feed = await _afetch(feed_url)
+        if get_feed_error(feed) is None:
+            await cache.aset(get_feed_cache_key(feed_url), feed, timeout)
+    return feed
+
+
+async def _afetch(feed_url):
+    loop = asyncio.get_running_loop()
+    try:
+        client_session = _get_aiohttp().ClientSession
+    except ImportError:
+        return await loop.run_in_executor(None, _get_feedparser().parse, feed_url)
+    feedparser = _get_feedparser()
+    try:
+        async with client_session() as session:
+            async with session.get(feed_url) as response:
+                body = await response.read()
+                # feedparser only looks up lower-case header names.
+                headers = dict((name.lower(), value) for name, value in response.headers.items())
+                headers['content-location'] = str(response.url)
+                href, status = str(response.url), response.status
+    except (_get_aiohttp().ClientError, asyncio.TimeoutError) as e:
+        # Mirror the result feedparser gives when its own fetch fails.
+        return feedparser.FeedParserDict(bozo=True, bozo_exception=e, entries=[],
+                                         feed=feedparser.FeedParserDict(), headers={})
+    feed = await loop.run_in_executor(None, lambda: feedparser.parse(body, response_headers=headers))
+    feed['href'] = href
+    feed['status'] = status
+    return feed
+
+
+class FeedNodeMixin(object):
+    """
+    Shared feed-loading behavior for the feed tags; feeds already
+    fetched by ``template_utils.preload.apreload`` are reused, keyed
+    on their URL.
+    
+    """
+    def get_preload_key(self, context):
+        return ('feed', self.feed_url.resolve(context))
+    
+    async def aload(self, context):
+        return await aparse(self.feed_url.resolve(context))
+    
+    def get_feed(self, context):
+        feed_url = self.feed_url.resolve(context)
+        return get_preloaded(context, ('feed', feed_url), parse, feed_url)
+
+
+class FeedIncludeNode(FeedNodeMixin, template.Node):
     def __init__(self, feed_url, template_name, num_items=None):
         self.feed_url = template.Variable(feed_url)
         self.num_items = num_items
         self.template_name = template_name
 
     def render(self, context):
-        feed_url = self.feed_url.resolve(context)
-        feed = feedparser.parse(feed_url)
+        feed = self.get_feed(context)
         items = []
         num_items = int(self.num_items) or len(feed['entries'])
         for i in range(num_items):
@@ -37,14 +156,13 @@ class FeedIncludeNode(template.Node):
                                                       'feed': feed })
 
 
-class FeedParserNode(ContextUpdatingNode):
+class FeedParserNode(FeedNodeMixin, ContextUpdatingNode):
     def __init__(self, feed_url, varname):
         self.feed_url = template.Variable(feed_url)
         self.varname = varname
     
     def get_content(self, context):
-        feed_url = self.feed_url.resolve(context)
-        return { self.varname: feedparser.parse(feed_url) }
+        return { self.varname: self.get_feed(context) }
 
 
 def do_include_feed(parser, token):
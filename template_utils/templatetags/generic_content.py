@@ -4,10 +4,15 @@ Template tags which can do retrieval of content from any model.
 """
 
 
+import base64
+import binascii
+import json
+
 from django import template
-from django.db.models import get_model
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
 
-from template_utils.nodes import ContextUpdatingNode, GenericContentNode
+from template_utils.nodes import ContextUpdatingNode, GenericContentNode, get_model, get_preloaded
 
 
 class RandomObjectsNode(GenericContentNode):
@@ -15,11 +20,136 @@ class RandomObjectsNode(GenericContentNode):
     A subclass of ``GenericContentNode`` which overrides
     ``_get_query_set`` to apply random ordering.
     
+    Results are never cached, since they should differ on each
+    render.
+    
     """
+    cache_results = False
+    
     def _get_query_set(self):
         return self.query_set.order_by('?')
 
 
+class KeysetWindowNode(GenericContentNode):
+    """
+    A subclass of ``GenericContentNode`` which retrieves a window of
+    ``num`` objects following a cursor, using keyset pagination on
+    the model's default ordering.
+    
+    Rather than skipping rows with ``OFFSET``, the window is selected
+    by filtering on the values of the ordering fields of the last
+    object seen, so retrieving a deep page costs the same as
+    retrieving the first one (given an index on those fields). The
+    primary key is added as a final ordering field, so that the
+    ordering is unambiguous.
+    
+    The window is stored in ``varname``, and a cursor for the window
+    after it (or ``None``, if there are no more objects) in
+    ``[varname]_next_cursor``. A missing, empty or invalid cursor
+    retrieves the first window.
+    
+    Results are not cached.
+    
+    """
+    cache_results = False
+    
+    def __init__(self, model, num, varname, after):
+        super(KeysetWindowNode, self).__init__(model, num, varname)
+        self.after = template.Variable(after)
+        self.ordering = []
+        for name in self.model._meta.ordering:
+            if not isinstance(name, str) or name == '?':
+                raise template.TemplateSyntaxError("Keyset pagination requires '%s' to be ordered by field names" % model)
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                if name != 'pk':
+                    raise template.TemplateSyntaxError("Keyset pagination can't order '%s' by '%s'" % (model, name))
+                field = self.model._meta.pk
+            if field.is_relation:
+                raise template.TemplateSyntaxError("Keyset pagination can't order '%s' by related field '%s'" % (model, name))
+            # NULLs never match the comparisons in the keyset filter,
+            # so rows with them could never be reached.
+            if field.null:
+                raise template.TemplateSyntaxError("Keyset pagination can't order '%s' by nullable field '%s'" % (model, name))
+            self.ordering.append((field, descending))
+        if self.model._meta.pk not in [field for field, descending in self.ordering]:
+            self.ordering.append((self.model._meta.pk, False))
+    
+    def _get_query_set(self):
+        return self.query_set.order_by(*[(descending and '-' or '') + field.name
+                                         for field, descending in self.ordering])
+    
+    def encode_cursor(self, obj):
+        values = [field.value_to_string(obj) for field, descending in self.ordering]
+        return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+    
+    def decode_cursor(self, cursor):
+        """
+        Returns the ordering-field values encoded in ``cursor``, or
+        ``None`` if it is empty or invalid.
+        
+        """
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(str(cursor).encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                return None
+            values = [field.to_python(value) for (field, descending), value in zip(self.ordering, values)]
+        except (binascii.Error, UnicodeError, TypeError, ValueError, ValidationError):
+            return None
+        if any(value is None for value in values):
+            return None
+        return values
+    
+    def _get_window_query_set(self, cursor):
+        query_set = self._get_query_set()
+        values = self.decode_cursor(cursor)
+        if values is not None:
+            # (a < x) OR (a = x AND b < y) OR ..., with the comparison
+            # reversed for ascending fields.
+            condition = Q()
+            for i, (field, descending) in enumerate(self.ordering):
+                lookups = dict((earlier.name, value) for (earlier, d), value in zip(self.ordering[:i], values))
+                lookups['%s__%s' % (field.name, descending and 'lt' or 'gt')] = values[i]
+                condition |= Q(**lookups)
+            query_set = query_set.filter(condition)
+        # One extra object tells us whether there's another window.
+        return query_set[:self.num + 1]
+    
+    def _make_window(self, objects):
+        if len(objects) > self.num:
+            return objects[:self.num], self.encode_cursor(objects[self.num - 1])
+        return objects, None
+    
+    def get_window(self, cursor):
+        return self._make_window(list(self._get_window_query_set(cursor)))
+    
+    async def aget_window(self, cursor):
+        return self._make_window([obj async for obj in self._get_window_query_set(cursor)])
+    
+    def _resolve_cursor(self, context):
+        try:
+            return self.after.resolve(context)
+        except template.VariableDoesNotExist:
+            return None
+    
+    def get_preload_key(self, context):
+        return (self, self._resolve_cursor(context))
+    
+    async def aload(self, context):
+        return await self.aget_window(self._resolve_cursor(context))
+    
+    def get_content(self, context):
+        cursor = self._resolve_cursor(context)
+        objects, next_cursor = get_preloaded(context, (self, cursor), self.get_window, cursor)
+        return { self.varname: objects,
+                 '%s_next_cursor' % self.varname: next_cursor }
+
+
 class RetrieveObjectNode(ContextUpdatingNode):
     """
     ``Node`` subclass which retrieves a single object -- by
@@ -33,12 +163,30 @@ class RetrieveObjectNode(ContextUpdatingNode):
     def __init__(self, model, pk, varname):
         self.pk = template.Variable(pk)
         self.varname = varname
-        self.model = get_model(*model.split('.'))
+        self.model = get_model(model)
         if self.model is None:
             raise template.TemplateSyntaxError("Generic content tag got invalid model: %s" % model)
     
+    def get_preload_key(self, context):
+        return (self, self.pk.resolve(context))
+    
+    async def aload(self, context):
+        return await self.model._default_manager.aget(pk=self.pk.resolve(context))
+    
     def get_content(self, context):
-        return { self.varname: self.model._default_manager.get(pk=self.pk.resolve(context))}
+        pk = self.pk.resolve(context)
+        return { self.varname: get_preloaded(context, (self, pk),
+                                             self.model._default_manager.get, pk=pk) }
+
+
+def _get_num(tag_name, num):
+    try:
+        value = int(num)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise template.TemplateSyntaxError("'%s' tag got invalid number of objects: %s" % (tag_name, num))
+    return value
 
 
 def do_latest_object(parser, token):
@@ -68,21 +216,33 @@ def do_latest_objects(parser, token):
     Retrieves the latest ``num`` objects from a given model, in that
     model's default ordering, and stores them in a context variable.
     
+    Optionally, retrieves the ``num`` objects following a cursor
+    instead, and also stores a cursor for the next ``num`` objects in
+    ``[varname]_next_cursor``; see ``KeysetWindowNode``.
+    
     Syntax::
     
         {% get_latest_objects [app_name].[model_name] [num] as [varname] %}
+        {% get_latest_objects [app_name].[model_name] [num] after [cursor] as [varname] %}
     
     Example::
     
         {% get_latest_objects comments.freecomment 5 as latest_comments %}
+        {% get_latest_objects comments.freecomment 20 after request.GET.cursor as comments %}
     
     """
     bits = token.contents.split()
+    if len(bits) == 7:
+        if bits[3] != 'after':
+            raise template.TemplateSyntaxError("third argument to '%s' tag must be 'after'" % bits[0])
+        if bits[5] != 'as':
+            raise template.TemplateSyntaxError("fifth argument to '%s' tag must be 'as'" % bits[0])
+        return KeysetWindowNode(bits[1], _get_num(bits[0], bits[2]), bits[6], bits[4])
     if len(bits) != 5:
-        raise template.TemplateSyntaxError("'%s' tag takes four arguments" % bits[0])
+        raise template.TemplateSyntaxError("'%s' tag takes either four or six arguments" % bits[0])
     if bits [3] != 'as':
         raise template.TemplateSyntaxError("third argument to '%s' tag must be 'as'" % bits[0])
-    return GenericContentNode(bits[1], bits[2], bits[4])
+    return GenericContentNode(bits[1], _get_num(bits[0], bits[2]), bits[4])
 
 def do_random_object(parser, token):
     """
@@ -125,7 +285,7 @@ def do_random_objects(parser, token):
         raise template.TemplateSyntaxError("'%s' tag takes four arguments" % bits[0])
     if bits [3] != 'as':
         raise template.TemplateSyntaxError("third argument to '%s' tag must be 'as'" % bits[0])
-    return RandomObjectsNode(bits[1], bits[2], bits[4])
+    return RandomObjectsNode(bits[1], _get_num(bits[0], bits[2]), bits[4])
 
 
 def do_retrieve_object(parser, token):
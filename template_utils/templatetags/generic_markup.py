@@ -6,12 +6,16 @@ typographic appeal of text on the Web.
 
 
 from django.conf import settings
-from django.template import Library
+from django.template import Library, TemplateSyntaxError
 from django.utils.safestring import mark_safe
 
+from template_utils.lazy import lazy_module
 from template_utils.markup import formatter
 
 
+_get_smartypants = lazy_module('smartypants')
+
+
 def apply_markup(value, arg=None):
     """
     Applies text-to-HTML conversion.
@@ -30,17 +34,21 @@ def smartypants(value):
     niceties.
     
     Requires the Python SmartyPants library to be installed; see
-    http://web.chad.org/projects/smartypants.py/
+    http://web.chad.org/projects/smartypants.py/ (both the original
+    ``smartyPants`` function and the ``smartypants`` function of
+    later releases are supported).
     
     """
     try:
-        from smartypants import smartyPants
+        module = _get_smartypants()
     except ImportError:
+        module = None
+    smartyPants = getattr(module, 'smartyPants', None) or getattr(module, 'smartypants', None)
+    if smartyPants is None:
         if settings.DEBUG:
-            raise template.TemplateSyntaxError("Error in smartypants filter: the Python smartypants module is not installed or could not be imported")
+            raise TemplateSyntaxError("Error in smartypants filter: the Python smartypants module is not installed or could not be imported")
         return value
-    else:
-        return mark_safe(smartyPants(value))
+    return mark_safe(smartyPants(value))
 
 register = Library()
 register.filter(apply_markup)
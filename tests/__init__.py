@@ -0,0 +1,24 @@
+import tempfile
+
+
+def setup_django():
+    """
+    Configures Django for the tests which need it, with a throwaway
+    SQLite database file -- rather than an in-memory database, so
+    that the async ORM's and the cache-warming command's threads see
+    the same data.
+    
+    """
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+    if settings.configured:
+        return
+    settings.configure(INSTALLED_APPS=['django.contrib.auth', 'django.contrib.contenttypes',
+                                       'template_utils', 'tests'],
+                       DATABASES={ 'default': { 'ENGINE': 'django.db.backends.sqlite3',
+                                                'NAME': tempfile.mkstemp(suffix='.sqlite3')[1] } },
+                       TEMPLATES=[{ 'BACKEND': 'django.template.backends.django.DjangoTemplates' }],
+                       USE_TZ=True)
+    django.setup()
+    call_command('migrate', run_syncdb=True, verbosity=0)
@@ -0,0 +1,53 @@
+"""
+A local HTTP server serving a small RSS feed, for the feed tests.
+
+"""
+
+import http.server
+import threading
+
+
+FEED = b"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0">
+  <channel>
+    <title>Test feed</title>
+    <link>/</link>
+    <item>
+      <title>First</title>
+      <link>first.html</link>
+      <description>The first item.</description>
+    </item>
+  </channel>
+</rss>
+"""
+
+
+class FeedHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/feeds/rss.xml':
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/rss+xml; charset=utf-8')
+            self.end_headers()
+            self.wfile.write(FEED)
+        else:
+            self.send_response(404)
+            self.send_header('Content-Type', 'text/html')
+            self.end_headers()
+            self.wfile.write(b'<h1>Not found</h1>')
+
+    def log_message(self, *args):
+        pass
+
+
+def start():
+    """
+    Starts the server in a background thread, and returns it; its
+    base URL is in ``server.url``.
+
+    """
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+    server.url = 'http://127.0.0.1:%d' % server.server_port
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
@@ -0,0 +1,39 @@
+"""
+Filter functions for the ``MarkupFormatter`` tests; these live in
+their own module so worker processes can import them by name.
+
+"""
+
+import os
+import time
+
+
+def paragraph(text, **kwargs):
+    return '<p>%s</p>' % text
+
+def sleepy(text, seconds=0, **kwargs):
+    time.sleep(seconds)
+    return '<p>%s</p>' % text
+
+def broken(text, **kwargs):
+    raise ValueError(text)
+
+def pid(text, **kwargs):
+    return os.getpid()
+
+def crash(text, **kwargs):
+    os._exit(1)
+
+class StubbornError(Exception):
+    """
+    An exception which pickles, but can't be unpickled, since its
+    constructor needs an argument not kept in ``args`` (like docutils'
+    ``SystemMessage``).
+    
+    """
+    def __init__(self, message, level):
+        Exception.__init__(self, message)
+        self.level = level
+
+def stubborn(text, **kwargs):
+    raise StubbornError(text, 2)
@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class Entry(models.Model):
+    title = models.CharField(max_length=100)
+    published = models.DateTimeField()
+
+    class Meta:
+        app_label = 'tests'
+        ordering = ['-published']
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from tests import feed_server, setup_django
+
+setup_django()
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from template_utils.preload import apreload
+from template_utils.templatetags import feeds
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+# Nothing listens on the discard port, so connections are refused.
+UNREACHABLE_URL = 'http://127.0.0.1:9/feeds/rss.xml'
+
+
+def setUpModule():
+    global server
+    server = feed_server.start()
+
+
+def tearDownModule():
+    server.shutdown()
+
+
+class FeedPreloadTests(unittest.TestCase):
+    template = Template('{% load feeds %}{% parse_feed url as feed %}'
+                        '{% for entry in feed.entries %}{{ entry.link }}{% endfor %}')
+
+    def setUp(self):
+        self.url = server.url + '/feeds/rss.xml'
+
+    def preload(self, url):
+        context = Context({ 'url': url })
+        preloaded = asyncio.run(apreload(self.template, context))
+        return preloaded[('feed', url)], context
+
+    def assertSameFeed(self, feed, expected):
+        for key in ('bozo', 'href', 'status', 'encoding', 'version'):
+            self.assertEqual(feed.get(key), expected.get(key), key)
+        self.assertEqual(feed.feed.title, expected.feed.title)
+        self.assertEqual([entry.link for entry in feed.entries],
+                         [entry.link for entry in expected.entries])
+
+    @unittest.skipUnless(aiohttp, 'aiohttp is not installed')
+    def test_aiohttp_fetch_matches_sync_parse(self):
+        feed, context = self.preload(self.url)
+        self.assertSameFeed(feed, feeds.parse(self.url))
+        self.assertEqual(feed.entries[0].link, server.url + '/feeds/first.html')
+
+    def test_thread_fetch_matches_sync_parse(self):
+        with mock.patch.object(feeds, '_get_aiohttp', side_effect=ImportError):
+            feed, context = self.preload(self.url)
+        self.assertSameFeed(feed, feeds.parse(self.url))
+
+    @unittest.skipUnless(aiohttp, 'aiohttp is not installed')
+    def test_aiohttp_error_status(self):
+        url = server.url + '/missing.xml'
+        feed, context = self.preload(url)
+        self.assertEqual(feed.status, 404)
+        self.assertEqual(feed.entries, [])
+
+    @unittest.skipUnless(aiohttp, 'aiohttp is not installed')
+    def test_aiohttp_connection_failure(self):
+        feed, context = self.preload(UNREACHABLE_URL)
+        self.assertTrue(feed.bozo)
+        self.assertEqual(feed.entries, [])
+        self.assertEqual(self.template.render(context), '')
+
+    def test_render_uses_preloaded_feed(self):
+        feed, context = self.preload(self.url)
+        with mock.patch.object(feeds, 'parse') as parse:
+            output = self.template.render(context)
+        self.assertFalse(parse.called)
+        self.assertEqual(output, server.url + '/feeds/first.html')
+
+
+@override_settings(FEED_CACHE_TIMEOUT=60)
+class FeedCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_successful_fetch_is_cached(self):
+        url = server.url + '/feeds/rss.xml'
+        feeds.parse(url)
+        self.assertIsNotNone(cache.get(feeds.get_feed_cache_key(url)))
+
+    def test_failed_fetches_are_not_cached(self):
+        for url in (server.url + '/missing.xml', UNREACHABLE_URL):
+            self.assertIsNotNone(feeds.get_feed_error(feeds.parse(url)))
+            self.assertIsNotNone(feeds.get_feed_error(asyncio.run(feeds.aparse(url))))
+            self.assertIsNone(cache.get(feeds.get_feed_cache_key(url)), url)
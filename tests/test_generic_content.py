@@ -0,0 +1,114 @@
+import asyncio
+import base64
+import json
+from unittest import mock
+
+from tests import setup_django
+
+setup_django()
+
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from template_utils.preload import apreload
+from template_utils.templatetags.generic_content import KeysetWindowNode
+from tests.models import Entry
+
+
+WINDOW = ("{% load generic_content %}"
+          "{% get_latest_objects tests.entry 2 after cursor as entries %}"
+          "{% for entry in entries %}{{ entry.title }} {% endfor %}")
+
+
+def encode(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def create_entries():
+    now = timezone.now()
+    # Three entries share a publication date, so paging has to fall
+    # back on the primary key to keep their order stable.
+    for i in range(7):
+        Entry.objects.create(title='e%d' % i,
+                             published=now if i in (2, 3, 4) else now.replace(year=2000 + i))
+
+
+class KeysetWindowTests(TestCase):
+    def setUp(self):
+        create_entries()
+        self.window = Template(WINDOW)
+
+    def render(self, cursor):
+        context = Context({ 'cursor': cursor })
+        output = self.window.render(context)
+        return output.split(), context['entries_next_cursor']
+
+    def test_pages_through_every_object_once(self):
+        pages = []
+        cursor = None
+        while True:
+            titles, cursor = self.render(cursor)
+            pages.append(titles)
+            if cursor is None:
+                break
+        self.assertEqual(pages, [['e2', 'e3'], ['e4', 'e6'], ['e5', 'e1'], ['e0']])
+
+    def test_exact_final_page_has_no_next_cursor(self):
+        Entry.objects.get(title='e0').delete()
+        titles, cursor = self.render(None)
+        for i in range(2):
+            titles, cursor = self.render(cursor)
+        self.assertEqual((titles, cursor), (['e5', 'e1'], None))
+
+    def test_invalid_cursors_start_at_the_beginning(self):
+        first_page = self.render(None)
+        for cursor in ['', 'garbage!', encode([]), encode({}), encode(['x', '1']),
+                       encode([{}, '1']), encode([None, 1]), encode(['2020-01-01T00:00:00+00:00', None])]:
+            self.assertEqual(self.render(cursor), first_page, cursor)
+
+
+class KeysetWindowSyntaxTests(TestCase):
+    def compile(self, tag):
+        return Template("{% load generic_content %}" + tag)
+
+    def test_nullable_ordering_field_is_rejected(self):
+        with mock.patch.object(Entry._meta.get_field('published'), 'null', True):
+            self.assertRaises(TemplateSyntaxError, self.compile,
+                              "{% get_latest_objects tests.entry 2 after cursor as entries %}")
+
+    def test_related_ordering_field_is_rejected(self):
+        self.assertRaises(TemplateSyntaxError, self.compile,
+                          "{% get_latest_objects auth.permission 2 after cursor as p %}")
+
+    def test_invalid_num_is_rejected(self):
+        for num in ('two', '0', '-1'):
+            self.assertRaises(TemplateSyntaxError, self.compile,
+                              "{%% get_latest_objects tests.entry %s after cursor as entries %%}" % num)
+            self.assertRaises(TemplateSyntaxError, self.compile,
+                              "{%% get_latest_objects tests.entry %s as entries %%}" % num)
+
+
+class KeysetWindowPreloadTests(TransactionTestCase):
+    # The async ORM runs queries in another thread, which wouldn't see
+    # data from TestCase's uncommitted transaction.
+
+    def setUp(self):
+        create_entries()
+        self.window = Template(WINDOW)
+
+    def test_render_uses_preloaded_window(self):
+        first_page = Context({ 'cursor': None })
+        self.window.render(first_page)
+        context = Context({ 'cursor': first_page['entries_next_cursor'] })
+        preloaded = asyncio.run(apreload(self.window, context))
+        self.assertEqual(len(preloaded), 1)
+        (objects, next_cursor), = preloaded.values()
+        self.assertEqual([entry.title for entry in objects], ['e4', 'e6'])
+        self.assertIsNotNone(next_cursor)
+        with mock.patch.object(KeysetWindowNode, 'get_window') as get_window:
+            with self.assertNumQueries(0):
+                output = self.window.render(context)
+        self.assertFalse(get_window.called)
+        self.assertEqual(output.split(), ['e4', 'e6'])
+        self.assertEqual(context['entries_next_cursor'], next_cursor)
@@ -0,0 +1,39 @@
+import types
+import unittest
+from unittest import mock
+
+from tests import setup_django
+
+setup_django()
+
+from django.template import TemplateSyntaxError
+from django.test import override_settings
+
+from template_utils.templatetags import generic_markup
+
+
+def fake_smartypants(**attrs):
+    return mock.patch.object(generic_markup, '_get_smartypants',
+                             return_value=types.SimpleNamespace(**attrs))
+
+
+class SmartyPantsTests(unittest.TestCase):
+    def test_original_function_name(self):
+        with fake_smartypants(smartyPants=lambda text: 'old:' + text):
+            self.assertEqual(generic_markup.smartypants('hi'), 'old:hi')
+
+    def test_current_function_name(self):
+        with fake_smartypants(smartypants=lambda text: 'new:' + text):
+            self.assertEqual(generic_markup.smartypants('hi'), 'new:hi')
+
+    @override_settings(DEBUG=False)
+    def test_unusable_module_returns_value(self):
+        with fake_smartypants():
+            self.assertEqual(generic_markup.smartypants('hi'), 'hi')
+        with mock.patch.object(generic_markup, '_get_smartypants', side_effect=ImportError):
+            self.assertEqual(generic_markup.smartypants('hi'), 'hi')
+
+    @override_settings(DEBUG=True)
+    def test_unusable_module_raises_in_debug(self):
+        with fake_smartypants():
+            self.assertRaises(TemplateSyntaxError, generic_markup.smartypants, 'hi')
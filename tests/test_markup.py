@@ -0,0 +1,108 @@
+import threading
+import time
+import unittest
+
+from template_utils.markup import FilterAborted, MarkupFormatter, WorkerPool
+
+from tests import markup_filters
+
+
+class MarkupLimitsTests(unittest.TestCase):
+    def setUp(self):
+        self.formatter = MarkupFormatter()
+        self.formatter.register('paragraph', markup_filters.paragraph,
+                                max_length=10, timeout=5)
+        self.formatter.register('sleepy', markup_filters.sleepy, timeout=0.5)
+
+    def test_filter_result(self):
+        self.assertEqual(self.formatter('hi', filter_name='paragraph'), '<p>hi</p>')
+
+    def test_too_long_falls_back(self):
+        self.assertEqual(self.formatter('<b>' * 5, filter_name='paragraph'),
+                         '&lt;b&gt;' * 5)
+
+    def test_timeout_falls_back(self):
+        start = time.monotonic()
+        result = self.formatter('<i>', filter_name='sleepy', seconds=5)
+        self.assertEqual(result, '&lt;i&gt;')
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_custom_fallback(self):
+        formatter = MarkupFormatter(fallback=lambda text: 'fallback')
+        formatter.register('paragraph', markup_filters.paragraph, max_length=1)
+        self.assertEqual(formatter('hi', filter_name='paragraph'), 'fallback')
+
+    def test_filter_exception_is_raised(self):
+        self.formatter.register('broken', markup_filters.broken, timeout=5)
+        self.assertRaises(ValueError, self.formatter, 'oops', filter_name='broken')
+
+
+class WorkerPoolTests(unittest.TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(processes=2)
+
+    def get_pids(self):
+        return set(self.pool.run(5, markup_filters.pid, '', {}) for i in range(10))
+
+    def wait_for_idle(self):
+        deadline = time.monotonic() + 10
+        while self.pool._idle.qsize() < self.pool.processes and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def test_workers_are_reused(self):
+        self.pool.run(5, markup_filters.paragraph, 'hi', {})
+        self.assertEqual(len(self.get_pids()), 2)
+
+    def test_overrunning_worker_is_replaced(self):
+        self.pool.run(5, markup_filters.paragraph, 'hi', {})
+        before = set(worker.process.pid for worker in list(self.pool._idle.queue))
+        self.assertRaises(FilterAborted, self.pool.run, 0.2, markup_filters.sleepy, 'hi', { 'seconds': 5 })
+        self.wait_for_idle()
+        after = set(worker.process.pid for worker in list(self.pool._idle.queue))
+        self.assertEqual(len(after), 2)
+        self.assertEqual(len(before & after), 1)
+
+    def test_dead_worker_is_replaced(self):
+        self.assertRaises(FilterAborted, self.pool.run, 5, markup_filters.crash, '', {})
+        self.wait_for_idle()
+        self.assertEqual(self.pool.run(5, markup_filters.paragraph, 'hi', {}), '<p>hi</p>')
+
+    def assertPoolUsable(self):
+        self.assertEqual(self.pool._idle.qsize(), self.pool.processes)
+        self.assertEqual(self.pool.run(5, markup_filters.paragraph, 'hi', {}), '<p>hi</p>')
+
+    def test_unpicklable_exception_is_reported(self):
+        for i in range(self.pool.processes + 1):
+            with self.assertRaises(RuntimeError) as cm:
+                self.pool.run(5, markup_filters.stubborn, 'oops', {})
+            self.assertIn('StubbornError', str(cm.exception))
+        self.assertPoolUsable()
+
+    def test_unpicklable_filter_keeps_workers(self):
+        for i in range(self.pool.processes + 1):
+            self.assertRaises(Exception, self.pool.run, 5, lambda text, **kwargs: text, 'hi', {})
+        self.assertPoolUsable()
+
+    def test_contention_does_not_kill_healthy_workers(self):
+        self.pool.run(5, markup_filters.paragraph, 'hi', {})
+        before = set(worker.process.pid for worker in list(self.pool._idle.queue))
+        results = []
+        def call():
+            try:
+                results.append(self.pool.run(0.5, markup_filters.sleepy, 'hi', { 'seconds': 0.3 }))
+            except FilterAborted:
+                results.append(None)
+        threads = [threading.Thread(target=call) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 6)
+        self.assertEqual(results.count('<p>hi</p>'), 2)
+        self.wait_for_idle()
+        after = set(worker.process.pid for worker in list(self.pool._idle.queue))
+        self.assertEqual(before, after)
+
+
+if __name__ == '__main__':
+    unittest.main()
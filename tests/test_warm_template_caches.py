@@ -0,0 +1,82 @@
+import io
+import os
+import shutil
+import tempfile
+
+from tests import feed_server, setup_django
+
+setup_django()
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Template
+from django.test import TransactionTestCase, override_settings
+
+from template_utils.management.commands.warm_template_caches import find_work
+from template_utils.templatetags.feeds import get_feed_cache_key
+from tests.test_feeds import UNREACHABLE_URL
+
+
+TEMPLATE = """{%% load feeds generic_content %%}
+{%% parse_feed "%(feed_url)s" as feed %%}
+{%% include_feed "%(feed_url)s" 1 feed.html %%}
+{%% parse_feed "%(missing_url)s" as missing %%}
+{%% parse_feed "%(unreachable_url)s" as unreachable %%}
+{%% parse_feed url as variable %%}
+{%% get_latest_objects auth.user 2 as users %%}
+{%% get_random_object auth.user as random_user %%}
+"""
+
+
+def setUpModule():
+    global server
+    server = feed_server.start()
+
+
+def tearDownModule():
+    server.shutdown()
+
+
+@override_settings(FEED_CACHE_TIMEOUT=60, GENERIC_CONTENT_CACHE_TIMEOUT=60)
+class WarmTemplateCachesTests(TransactionTestCase):
+    def setUp(self):
+        self.feed_url = server.url + '/feeds/rss.xml'
+        self.missing_url = server.url + '/missing.xml'
+        self.source = TEMPLATE % { 'feed_url': self.feed_url,
+                                   'missing_url': self.missing_url,
+                                   'unreachable_url': UNREACHABLE_URL }
+        self.template_dir = tempfile.mkdtemp()
+        with open(os.path.join(self.template_dir, 'page.html'), 'w') as f:
+            f.write(self.source)
+        for i in range(3):
+            User.objects.create(username='u%d' % i)
+        cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.template_dir)
+        cache.clear()
+
+    def test_find_work(self):
+        work, uncached = find_work([Template(self.source)])
+        self.assertEqual(sorted(work.keys()),
+                         sorted(['feed %s' % self.feed_url,
+                                 'feed %s' % self.missing_url,
+                                 'feed %s' % UNREACHABLE_URL,
+                                 'GenericContentNode auth.User (2)']))
+        self.assertEqual(uncached, set(['RandomObjectsNode auth.User (1)']))
+
+    def test_handle(self):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with self.settings(TEMPLATES=[{ 'BACKEND': 'django.template.backends.django.DjangoTemplates',
+                                        'DIRS': [self.template_dir] }]):
+            call_command('warm_template_caches', stdout=stdout, stderr=stderr)
+        stdout, stderr = stdout.getvalue(), stderr.getvalue()
+        self.assertIn('Warmed 2 of 4 item(s)', stdout)
+        self.assertIn('skipped  RandomObjectsNode auth.User (1)', stdout)
+        self.assertIn('feed %s failed: HTTP status 404' % self.missing_url, stderr)
+        self.assertIn('feed %s failed' % UNREACHABLE_URL, stderr)
+        self.assertEqual(len(cache.get(get_feed_cache_key(self.feed_url)).entries), 1)
+        self.assertIsNone(cache.get(get_feed_cache_key(self.missing_url)))
+        self.assertIsNone(cache.get(get_feed_cache_key(UNREACHABLE_URL)))
+        self.assertEqual(len(cache._cache), 2)